@@ -1,22 +1,53 @@
 import streamlit as st
 import os
 import asyncio
-import json
+import orjson
 import random
+import hashlib
+import time
+import io
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from google import genai
 from google.genai import types
 import edge_tts
-from pydub import AudioSegment
 
 # --- CONFIGURATION ---
 MODEL_NAME = "gemini-2.5-flash"
+CACHE_TTL_SECONDS = 3600
+# rate="+15%" makes it sound like an excited podcaster
+SPEECH_RATE = "+15%"
+# Max simultaneous EdgeTTS connections; more than this just gets throttled server-side
+TTS_CONCURRENCY = 8
+# EdgeTTS returns 24kHz mono 48kbps MP3; anything spliced into its stream must match
+SAMPLE_RATE = 24000
+# Samples per MP3 frame at EdgeTTS's 24kHz (MPEG-2 Layer III)
+MP3_FRAME_SAMPLES = 576
+# The gap between lines, in MP3 frames: 4 frames at 24kHz = 96ms
+SILENCE_FRAMES = 4
+MP3_ENCODE_ARGS = ["-c:a", "libmp3lame", "-b:a", "48k"]
+# Layer III bitrates (kbps) by header index, for MPEG-1 (True) and MPEG-2/2.5 (False)
+MP3_BITRATES = {
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by header version bits: 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+# Download format -> (file extension / ffmpeg muxer, MIME type, ffmpeg args to encode it).
+# MP3 only gets encoded after a crossfade, otherwise the EdgeTTS frames are used as-is;
+# Opus 32k mono is ~4x smaller for speech.
+EXPORT_FORMATS = {
+    "MP3": ("mp3", "audio/mpeg", MP3_ENCODE_ARGS),
+    "Opus": ("ogg", "audio/ogg", [
+        "-c:a", "libopus", "-b:a", "32k", "-ac", "1", "-ar", "24000", "-application", "voip"
+    ]),
+}
 
 # --- HELPER FUNCTIONS ---
 
-def generate_podcast_script(topic, language, duration_minutes, api_key):
-    """Generates the conversation script using Gemini."""
-    client = genai.Client(api_key=api_key)
-    
+def build_script_prompt(topic, language, duration_minutes):
+    """Builds the showrunner prompt for Gemini."""
     # Podcast hosts speak about 160-170 words per minute
     target_word_count = duration_minutes * 170
     
@@ -26,7 +57,7 @@ def generate_podcast_script(topic, language, duration_minutes, api_key):
     elif language == "Hinglish":
         lang_instruction = "Write the dialogue in Hinglish (Hindi spoken in English script), which is casual and popular in India."
 
-    prompt = f"""
+    return f"""
     You are the showrunner for a popular, high-energy tech podcast.
     Topic: {topic}
     Target Length: Approx {target_word_count} words.
@@ -36,46 +67,156 @@ def generate_podcast_script(topic, language, duration_minutes, api_key):
     1. Host 1 (Alex/Rahul): Skeptical, energetic, interrupts often, speaks in short punchy sentences.
     2. Host 2 (Sarah/Aditi): The expert, but explains things like a storyteller, not a professor.
 
-    Format: RETURN ONLY A RAW JSON LIST of objects. Do not use Markdown code blocks.
-    Structure: [{{ "speaker": "Host 1", "text": "Wait, seriously?" }}, {{ "speaker": "Host 2", "text": "Yes! And here is why..." }}]
+    Format: Output one JSON object per line (NDJSON). No array wrapper, no trailing commas, no Markdown code blocks.
+    Structure:
+    {{"speaker": "Host 1", "text": "Wait, seriously?"}}
+    {{"speaker": "Host 2", "text": "Yes! And here is why..."}}
     
     IMPORTANT: Write for the ear, not the eye. Use short sentences. Use "Umm", "Actually", "Wow", "Right?", to make it sound human.
     """
 
+def is_script_line(obj):
+    """Checks that a parsed object is a usable {speaker, text} line."""
+    return isinstance(obj, dict) and isinstance(obj.get("speaker"), str) and isinstance(obj.get("text"), str)
+
+def parse_script_line(raw):
+    """Parses one NDJSON line into a {speaker, text} object, or None if it isn't one."""
+    # Tolerate a JSON list written one object per line: "[{...}," ... "{...}]"
+    raw = raw.strip().lstrip("[").rstrip("],").strip()
+    if not raw.startswith("{"):
+        return None
     try:
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=1.0 
-            )
-        )
-        return json.loads(response.text)
-    except Exception as e:
-        st.error(f"Error generating script: {e}")
+        line = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None
+    return line if is_script_line(line) else None
+
+def parse_script_text(text):
+    """Parses a whole response that wasn't NDJSON (e.g. a one-line or pretty-printed JSON list)."""
+    body = "\n".join(l for l in text.splitlines() if not l.strip().startswith("```"))
+    try:
+        parsed = orjson.loads(body)
+    except orjson.JSONDecodeError:
         return []
+    items = parsed if isinstance(parsed, list) else [parsed]
+    return [item for item in items if is_script_line(item)]
+
+class ScriptStreamParser:
+    """Incrementally pulls complete {speaker, text} objects out of a streamed NDJSON script."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.text = ""
+        self.found = 0
+
+    def feed(self, fragment):
+        """Adds a text fragment and returns every line that was completed by it."""
+        self.text += fragment
+        self.buffer += fragment
+        *complete, self.buffer = self.buffer.split("\n")
+        lines = [line for line in map(parse_script_line, complete) if line]
+        self.found += len(lines)
+        return lines
+
+    def close(self):
+        """Returns the final line, which may not end with a newline."""
+        line = parse_script_line(self.buffer)
+        self.buffer = ""
+        lines = [line] if line else []
+        if not self.found and not lines:
+            # Gemini ignored the NDJSON format; fall back to parsing the response as a whole
+            lines = parse_script_text(self.text)
+        self.found += len(lines)
+        return lines
+
+@st.cache_resource(show_spinner=False)
+def get_client(api_key):
+    """Builds the Gemini client once per process so reruns reuse its connection pool."""
+    return genai.Client(api_key=api_key)
+
+@st.cache_resource(show_spinner=False)
+def get_script_cache():
+    """Process-wide store of finished scripts as {key: (stored_at, script)}, so repeat requests skip Gemini."""
+    return {}
+
+async def stream_podcast_script(topic, language, duration_minutes, api_key, use_cache=True):
+    """Streams the conversation script from Gemini, yielding each line as soon as it is complete."""
+    # Key on a hash so the API key is never kept around in plaintext
+    api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+    cache_key = (topic, language, duration_minutes, api_key_hash)
+    script_cache = get_script_cache()
+    # Expire entries one by one, which also keeps the store from growing without bound
+    now = time.monotonic()
+    for key, (stored_at, _) in list(script_cache.items()):
+        if now - stored_at > CACHE_TTL_SECONDS:
+            script_cache.pop(key, None)
+    # Single lookup: another session may expire the entry at any moment
+    entry = script_cache.get(cache_key) if use_cache else None
+    if entry is not None:
+        for line in entry[1]:
+            yield line
+        return
+
+    client = get_client(api_key)
+    prompt = build_script_prompt(topic, language, duration_minutes)
+    parser = ScriptStreamParser()
+    script = []
+
+    # Errors propagate to the caller, which drops any lines already yielded
+    # The sync client is safe to share across reruns (each run gets a fresh event loop),
+    # so pull chunks from it on a worker thread instead of using client.aio.
+    stream = client.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            response_mime_type="text/plain",
+            temperature=1.0 
+        )
+    )
+    # A dedicated thread, so script chunks never queue behind TTS jobs on the default pool
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while (chunk := await loop.run_in_executor(executor, next, stream, None)) is not None:
+            if not chunk.text:
+                continue
+            for line in parser.feed(chunk.text):
+                script.append(line)
+                yield line
+    for line in parser.close():
+        script.append(line)
+        yield line
+
+    if not script:
+        raise ValueError("Gemini didn't return a script in a format we could read.")
+    script_cache[cache_key] = (time.monotonic(), script)
+
+async def read_tts_stream(communicate):
+    """Collects the MP3 bytes EdgeTTS streams back, without touching the disk."""
+    buffer = io.BytesIO()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            buffer.write(chunk["data"])
+    return buffer.getvalue()
 
-async def generate_audio_segment(text, voice, index, temp_dir="temp_audio"):
+@st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def tts_bytes(text, voice, rate):
+    """Synthesizes one line with EdgeTTS and returns the MP3 bytes (cached across reruns)."""
+    # volume="+0%" keeps volume standard
+    communicate = edge_tts.Communicate(text, voice, rate=rate)
+    # Runs in a worker thread, so it gets its own event loop
+    return asyncio.run(read_tts_stream(communicate))
+
+async def generate_audio_segment(text, voice, index, sem):
     """Generates a single audio segment using EdgeTTS with speed adjustments."""
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-        
-    output_file = os.path.join(temp_dir, f"seg_{index}.mp3")
-    
     try:
-        # rate="+15%" makes it sound like an excited podcaster
-        # volume="+0%" keeps volume standard
-        communicate = edge_tts.Communicate(text, voice, rate="+15%") 
-        await communicate.save(output_file)
-        return output_file
+        async with sem:
+            return await asyncio.to_thread(tts_bytes, text, voice, SPEECH_RATE)
     except Exception as e:
         print(f"Error on segment {index}: {e}")
         return None
 
-async def create_podcast_audio(script_json, language):
-    """Orchestrates the creation of all audio segments."""
-    
+def select_voices(language):
+    """Picks the (Host 1, Host 2) voice pair for the language."""
     # --- VOICE SELECTION (The "Realism" Upgrade) ---
     if language == "Hindi":
         voice_1 = "hi-IN-MadhurNeural" 
@@ -86,45 +227,278 @@ async def create_podcast_audio(script_json, language):
     else: # English - Using the best Multilingual voices for realism
         voice_1 = "en-US-AndrewMultilingualNeural" # Very realistic male
         voice_2 = "en-US-AvaMultilingualNeural"    # Very realistic female
+    return voice_1, voice_2
 
-    tasks = []
-    
-    progress_text = "🎙️ Recording... (Speed: 1.15x)"
-    my_bar = st.progress(0, text=progress_text)
+async def run_ffmpeg(*args, input_data=None):
+    """Runs ffmpeg with the given arguments, feeding `input_data` to its stdin, and returns its stdout."""
+    proc = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-y", "-loglevel", "error", *args,
+        stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate(input_data)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='ignore').strip()}")
+    return stdout
 
-    for i, line in enumerate(script_json):
-        speaker = line["speaker"]
-        text = line["text"]
-        
-        if "Host 1" in speaker or "Alex" in speaker or "Rahul" in speaker:
-            voice = voice_1
-        else:
-            voice = voice_2
-            
-        tasks.append(generate_audio_segment(text, voice, i))
-    
-    files = await asyncio.gather(*tasks)
-    my_bar.progress(50, text="🎚️ Mixing and tightening gaps...")
+def iter_mp3_frames(data):
+    """Yields (start, end, samples, main_data_begin) for each frame in an MP3 byte string by walking its Layer III headers."""
+    pos = 0
+    if data[:3] == b"ID3":
+        pos = 10 + (data[6] << 21 | data[7] << 14 | data[8] << 7 | data[9])
 
-    combined = AudioSegment.empty()
-    valid_files = [f for f in files if f is not None]
-    
-    for file in valid_files:
-        segment = AudioSegment.from_mp3(file)
-        combined += segment
-        # REDUCED SILENCE: 100ms (was 350ms). 
-        # This makes it feel like they are in the same room.
-        combined += AudioSegment.silent(duration=100) 
-    
-    # Cleanup
-    for file in valid_files:
+    while pos + 4 <= len(data):
+        header = int.from_bytes(data[pos:pos + 4], "big")
+        version = (header >> 19) & 3
+        layer = (header >> 17) & 3
+        bitrate_index = (header >> 12) & 15
+        rate_index = (header >> 10) & 3
+        if header >> 21 != 0x7FF or version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            # Not a frame header, scan forward until we find the next one
+            pos += 1
+            continue
+        mpeg1 = version == 3
+        bitrate = MP3_BITRATES[mpeg1][bitrate_index] * 1000
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        padding = (header >> 9) & 1
+        length = (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+        if pos + length > len(data):
+            # A cut-off last frame never decodes, so it mustn't count
+            break
+        # Side info follows the header (and the 2-byte CRC when the protection bit is 0) and
+        # opens with main_data_begin: 9 bits in MPEG-1, 8 bits in MPEG-2/2.5
+        side = pos + 4 + (0 if (header >> 16) & 1 else 2)
+        main_data_begin = (data[side] << 1 | data[side + 1] >> 7) if mpeg1 else data[side]
+        yield pos, pos + length, 1152 if mpeg1 else 576, main_data_begin
+        pos += length
+
+def count_mp3_samples(data):
+    """Counts the audio samples in an MP3 byte string."""
+    return sum(samples for _, _, samples, _ in iter_mp3_frames(data))
+
+def starts_fresh(data):
+    """True if the first frame doesn't borrow bit-reservoir bytes from whatever precedes it."""
+    return next((begin == 0 for _, _, _, begin in iter_mp3_frames(data)), True)
+
+@st.cache_resource(show_spinner=False)
+def get_silence_mp3():
+    """Renders the gap between lines once per process and keeps the MP3 bytes."""
+    # Same format as EdgeTTS output (24kHz mono 48kbps) so it can be spliced in as-is.
+    # No ID3/Xing headers: this gets spliced into the middle of the stream.
+    result = subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error",
+            "-f", "lavfi", "-i", "anullsrc=r=24000:cl=mono", "-t", "0.5",
+            *MP3_ENCODE_ARGS,
+            "-id3v2_version", "0", "-write_xing", "0", "-f", "mp3", "pipe:1"
+        ],
+        capture_output=True,
+        check=True
+    )
+    # The encoder's start delay and end padding would stretch a "-t 0.1" render to ~7 frames,
+    # so render extra and keep exactly SILENCE_FRAMES. The first frame never borrows from
+    # the bit reservoir, so the cut is self-contained.
+    frames = list(iter_mp3_frames(result.stdout))[:SILENCE_FRAMES]
+    return result.stdout[frames[0][0]:frames[-1][1]]
+
+async def decode_to_pcm(data, sem):
+    """Decodes one MP3 byte string to 16-bit mono PCM samples."""
+    async with sem:
+        pcm = await run_ffmpeg(
+            "-f", "mp3", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+            input_data=data
+        )
+    return np.frombuffer(pcm, dtype=np.int16)
+
+async def mix_with_gaps(segments, output_args):
+    """Splice-safe join: decodes each segment on its own and re-encodes with a silent gap after each."""
+    sem = asyncio.Semaphore(os.cpu_count() or 1)
+    pcm_segments = await asyncio.gather(*(decode_to_pcm(s, sem) for s in segments))
+    gap = np.zeros(SILENCE_FRAMES * MP3_FRAME_SAMPLES, dtype=np.int16)
+    mixed = np.concatenate([part for pcm in pcm_segments for part in (pcm, gap)] or [gap[:0]])
+    return await run_ffmpeg(
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "pipe:0",
+        *output_args,
+        input_data=mixed.tobytes()
+    )
+
+def crossfade_join(pcm_segments, overlap):
+    """Joins PCM segments end to end, blending `overlap` samples across each boundary."""
+    out = np.zeros(sum(len(pcm) for pcm in pcm_segments), dtype=np.int16)
+    pos = 0
+    for pcm in pcm_segments:
+        # Very short lines can't overlap more than their own length
+        n = min(overlap, pos, len(pcm))
+        if n:
+            fade_in = np.linspace(0.0, 1.0, n, endpoint=False, dtype=np.float32)
+            blended = out[pos - n:pos] * (1.0 - fade_in) + pcm[:n] * fade_in
+            out[pos - n:pos] = np.clip(blended, -32768, 32767).astype(np.int16)
+        out[pos:pos + len(pcm) - n] = pcm[n:]
+        pos += len(pcm) - n
+    return out[:pos]
+
+async def decode_joined(segments):
+    """Decodes fresh-start segments in one ffmpeg call and splits the PCM back per segment."""
+    if not segments:
+        return []
+    # The boundaries come from each segment's frame count,
+    # which is walked on a worker thread while ffmpeg is busy decoding
+    pcm, lengths = await asyncio.gather(
+        run_ffmpeg(
+            "-f", "mp3", "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+            input_data=b"".join(segments)
+        ),
+        asyncio.to_thread(list, map(count_mp3_samples, segments))
+    )
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    # A frame or more off means the frame counts don't describe the decoded audio, e.g. a
+    # leading Info/Xing frame the demuxer dropped (one inside a later segment decodes as a
+    # frame of silence, so it still counts right). The boundaries would drift, so give up.
+    if abs(sum(lengths) - len(samples)) >= MP3_FRAME_SAMPLES:
+        raise ValueError(
+            f"Decoded {len(samples)} samples but the segments' frames add up to {sum(lengths)}"
+        )
+    # Any decoder delay trimmed at the very start only shortens the first segment
+    ends = np.cumsum(lengths) - (sum(lengths) - len(samples))
+    return np.split(samples, ends[:-1].clip(0))
+
+async def mix_with_crossfade(segments, crossfade_ms, output_args):
+    """Decodes the segments and overlaps neighbouring lines instead of leaving a gap."""
+    # Gluing segments together before decoding is only safe for those whose first frame
+    # doesn't borrow from the bit reservoir; any that do are decoded on their own
+    fresh = [starts_fresh(s) for s in segments]
+    sem = asyncio.Semaphore(os.cpu_count() or 1)
+    joined_pcm, alone_pcm = await asyncio.gather(
+        decode_joined([s for s, ok in zip(segments, fresh) if ok]),
+        asyncio.gather(*(decode_to_pcm(s, sem) for s, ok in zip(segments, fresh) if not ok))
+    )
+    joined_iter, alone_iter = iter(joined_pcm), iter(alone_pcm)
+    pcm_segments = [next(joined_iter) if ok else next(alone_iter) for ok in fresh]
+
+    overlap = SAMPLE_RATE * crossfade_ms // 1000
+    mixed = await asyncio.to_thread(crossfade_join, pcm_segments, overlap)
+    return await run_ffmpeg(
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "pipe:0",
+        *output_args,
+        input_data=mixed.tobytes()
+    )
+
+async def create_podcast_audio(tasks, export_format="MP3", crossfade_ms=0):
+    """Joins the recorded segments, in script order, and returns the finished track as bytes."""
+    extension, _, codec_args = EXPORT_FORMATS[export_format]
+    # The finished track comes back on stdout; nothing is written to disk
+    output_args = ["-f", extension, "pipe:1"]
+
+    if crossfade_ms:
+        segments = await asyncio.gather(*tasks)
+        valid_segments = [s for s in segments if s is not None]
         try:
-            os.remove(file)
-        except:
-            pass
-            
+            return await mix_with_crossfade(valid_segments, crossfade_ms, codec_args + output_args)
+        except ValueError:
+            # Couldn't line up the segment boundaries; the plain gap join below still works
+            st.warning("⚠️ Couldn't line up the crossfade, so the lines are joined with a short pause instead.")
+
+    # REDUCED SILENCE: ~100ms (was 350ms), exactly 4 MP3 frames = 96ms.
+    # This makes it feel like they are in the same room.
+    # The first render blocks on ffmpeg, so keep it off the event loop while TTS finishes.
+    segments, silence = await asyncio.gather(
+        asyncio.gather(*tasks),
+        asyncio.to_thread(get_silence_mp3)
+    )
+
+    # Interleave segments and gaps in one preallocated list, then copy everything exactly once
+    valid_segments = [s for s in segments if s is not None]
+    parts = [silence] * (2 * len(valid_segments))
+    parts[::2] = valid_segments
+
+    # MP3 frames aren't self-contained: each may borrow bits from the frames before it (the
+    # bit reservoir). Splicing the raw bytes is only safe when every part's first frame has
+    # main_data_begin == 0, as a fresh EdgeTTS encode does. Otherwise decode each segment
+    # on its own and re-encode.
+    if not all(map(starts_fresh, valid_segments + [silence])):
+        return await mix_with_gaps(valid_segments, codec_args + output_args)
+
+    # Every part starts fresh and shares EdgeTTS's 24kHz mono 48kbps format,
+    # so appending the bytes is already a playable file
+    if export_format == "MP3":
+        return b"".join(parts)
+
+    # Segments never hit the disk: ffmpeg reads the MP3 frames straight from stdin
+    return await run_ffmpeg("-f", "mp3", "-i", "pipe:0", *codec_args, *output_args, input_data=b"".join(parts))
+
+async def stream_script_and_audio(topic, language, duration_minutes, api_key, export_format="MP3", crossfade_ms=0, use_cache=True):
+    """Records each line while Gemini is still writing the rest of the script."""
+    voice_1, voice_2 = select_voices(language)
+    voice_map = {
+        "Host 1": voice_1, "Alex": voice_1, "Rahul": voice_1,
+        "Host 2": voice_2, "Sarah": voice_2, "Aditi": voice_2,
+    }
+
+    script = []
+    tasks = []
+    # The script length isn't known while streaming, so cap at the fixed limit
+    sem = asyncio.Semaphore(TTS_CONCURRENCY)
+    my_bar = st.progress(0, text="🧠 Brainstorming a realistic script...")
+
+    def record_turn(voice, texts):
+        # Start recording right away; TTS overlaps with the rest of the script
+        return asyncio.create_task(generate_audio_segment(" ".join(texts), voice, len(tasks), sem))
+
+    # Back-to-back lines from the same host go out as one EdgeTTS request
+    turn_voice = None
+    turn_texts = []
+
+    try:
+        async for line in stream_podcast_script(topic, language, duration_minutes, api_key, use_cache):
+            # "Host 1 (Alex)" -> "Host 1", "Rahul Sharma" -> "Rahul"
+            name = line["speaker"].split("(")[0].strip()
+            voice = voice_map.get(name) or voice_map.get(name.split(" ")[0])
+            if voice is None:
+                # Labels like "Host 1:" or "Alex/Rahul" miss the table; fall back to a substring check
+                speaker = line["speaker"]
+                voice = voice_1 if any(n in speaker for n in ("Host 1", "Alex", "Rahul")) else voice_2
+
+            if voice != turn_voice and turn_texts:
+                tasks.append(record_turn(turn_voice, turn_texts))
+                turn_texts = []
+            turn_voice = voice
+            turn_texts.append(line["text"])
+            script.append(line)
+            my_bar.progress(0, text=f"🎙️ Recording while writing... ({len(script)} lines so far)")
+    except Exception as e:
+        # Don't pass off a script that was cut short as a finished podcast
+        for task in tasks:
+            task.cancel()
+        my_bar.empty()
+        st.error(f"Error generating script: {e}")
+        return [], None
+
+    if turn_texts:
+        tasks.append(record_turn(turn_voice, turn_texts))
+
+    if not script:
+        my_bar.empty()
+        return script, None
+
+    try:
+        progress_text = "🎙️ Recording... (Speed: 1.15x)"
+        for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+            await task
+            my_bar.progress(int(done / len(tasks) * 90), text=progress_text)
+
+        my_bar.progress(90, text="🎚️ Mixing and tightening gaps...")
+        audio_bytes = await create_podcast_audio(tasks, export_format, crossfade_ms)
+    except Exception as e:
+        # The script is finished, so still hand it back even if the audio didn't make it
+        my_bar.empty()
+        st.error(f"An error occurred during audio generation: {e}")
+        return script, None
+
     my_bar.progress(100, text="✅ Done!")
-    return combined
+    return script, audio_bytes
 
 # --- MAIN UI ---
 def main():
@@ -146,6 +520,16 @@ def main():
         duration = st.slider("Duration (Minutes)", 1, 10, 3)
         st.write("---")
         st.markdown("**Audio Style:**\n\n⚡ Fast Paced (+15%)\n\n🗣️ Natural Interruptions")
+        st.write("---")
+        compact = st.toggle("Compact download (Opus 32 kbps)", value=False,
+                            help="About 4x smaller file. MP3 is fastest since it skips re-encoding.")
+        export_format = "Opus" if compact else "MP3"
+        overlap = st.toggle("Natural overlap (30 ms crossfade)", value=False,
+                            help="Blends speakers into each other instead of a 100 ms pause. Needs a re-encode.")
+        crossfade_ms = 30 if overlap else 0
+        # Same topic + settings reuse the last script for an hour unless asked otherwise
+        fresh_script = st.toggle("Write a new script", value=False,
+                                 help="Ignore the cached script for this topic and ask Gemini again.")
         
     topic = st.text_area("What should the podcast be about?", 
                          placeholder="e.g., The future of AI in India...", height=100)
@@ -154,37 +538,37 @@ def main():
 
     if generate_btn and topic:
         
-        # 1. Generate Script
-        with st.spinner("🧠 Brainstorming a realistic script..."):
-            script = generate_podcast_script(topic, language, duration, api_key)
+        # 1. Generate Script + Audio (recording starts as soon as each line is written)
+        try:
+            # asyncio.run closes the loop afterwards, so nothing leaks across reruns
+            script, audio_bytes = asyncio.run(
+                stream_script_and_audio(topic, language, duration, api_key, export_format, crossfade_ms,
+                                        use_cache=not fresh_script)
+            )
+        except Exception as e:
+            st.error(f"An error occurred during audio generation: {e}")
+            script, audio_bytes = [], None
         
         if script:
             with st.expander("📝 View Generated Script"):
                 for line in script:
                     st.markdown(f"**{line['speaker']}:** {line['text']}")
             
-            # 2. Generate Audio
+        if audio_bytes is not None:
+            # 2. Play + Download
             try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                final_audio = loop.run_until_complete(create_podcast_audio(script, language))
-                
-                # 3. Export
-                output_filename = "podcast.mp3"
-                final_audio.export(output_filename, format="mp3")
-                
-                st.audio(output_filename, format="audio/mp3")
+                extension, mime, _ = EXPORT_FORMATS[export_format]
+                st.audio(audio_bytes, format=mime)
                 
-                with open(output_filename, "rb") as file:
-                    st.download_button(
-                        label="📥 Download MP3",
-                        data=file,
-                        file_name=f"podcast_{topic[:10].replace(' ', '_')}.mp3",
-                        mime="audio/mpeg"
-                    )
+                st.download_button(
+                    label=f"📥 Download {export_format}",
+                    data=audio_bytes,
+                    file_name=f"podcast_{topic[:10].replace(' ', '_')}.{extension}",
+                    mime=mime
+                )
                     
             except Exception as e:
-                st.error(f"An error occurred during audio generation: {e}")
+                st.error(f"An error occurred during audio export: {e}")
 
 if __name__ == "__main__":
     main()